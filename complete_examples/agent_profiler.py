@@ -0,0 +1,477 @@
+# Cisco Sample Code License 1.1
+# flopach 2025
+
+# ================== IMPORTS ==================
+import inspect
+import json
+import time
+import warnings
+from dataclasses import dataclass, field
+
+# ================== SPANS ==================
+
+# categories a span can belong to (used for the summary columns)
+KINDS = ("llm", "tool", "executor", "managed_agent", "step", "run")
+
+@dataclass(eq=False)
+class Span:
+    """
+    One timed section of an agent run: a model call, a tool call, an executor step, ...
+    """
+    kind: str
+    name: str
+    agent: str
+    parent: "Span | None" = None
+    children: list = field(default_factory=list)
+    wall: float = 0.0
+    cpu: float = 0.0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    cached_tokens: int = 0
+    error: str = ""
+
+    @property
+    def self_wall(self) -> float:
+        return max(self.wall - sum(child.wall for child in self.children), 0.0)
+
+    @property
+    def self_cpu(self) -> float:
+        return max(self.cpu - sum(child.cpu for child in self.children), 0.0)
+
+    def path(self) -> list:
+        node, names = self, []
+        while node is not None:
+            names.append(f"{node.kind}:{node.name}")
+            node = node.parent
+        return names[::-1]
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def walk_own(self):
+        """
+        Like walk(), but does not descend into managed agents: their time belongs to the managed_agent span.
+        """
+        yield self
+        for child in self.children:
+            if child.kind == "managed_agent":
+                yield child
+            else:
+                yield from child.walk_own()
+
+def _size(value) -> int:
+    """
+    Returns the approximate number of bytes of a value when sent over the wire.
+
+    Args:
+        value: Any value (string, dict, list, ChatMessage, ...)
+
+    Returns:
+        int: Length of the UTF-8 encoded representation
+    """
+    if value is None:
+        return 0
+    if isinstance(value, bytes):
+        return len(value)
+    if not isinstance(value, str):
+        try:
+            value = json.dumps(value, default=str)
+        except (TypeError, ValueError):
+            value = str(value)
+    return len(value.encode("utf-8", errors="replace"))
+
+def _token_usage(model, message) -> tuple:
+    """
+    Returns (tokens_in, tokens_out, cached_tokens) of the last model call.
+    Works with the token counters of smolagents models and with raw LiteLLM/OpenAI responses.
+    Local Ollama models do not report prompt caching, so cached_tokens stays 0 there.
+    """
+    tokens_in = getattr(model, "last_input_token_count", None) or 0
+    tokens_out = getattr(model, "last_output_token_count", None) or 0
+
+    token_usage = getattr(message, "token_usage", None)
+    if token_usage is not None:
+        tokens_in = getattr(token_usage, "input_tokens", tokens_in) or 0
+        tokens_out = getattr(token_usage, "output_tokens", tokens_out) or 0
+
+    cached_tokens = 0
+    usage = getattr(getattr(message, "raw", None), "usage", None)
+    if usage is not None:
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = (getattr(details, "cached_tokens", None)
+                         or getattr(usage, "cache_read_input_tokens", None)
+                         or 0)
+    return int(tokens_in), int(tokens_out), int(cached_tokens)
+
+# ================== PROXIES ==================
+
+class _ProfiledModel:
+    """
+    Wraps a smolagents model so every call is recorded as an 'llm' span.
+    All other attributes are forwarded to the wrapped model.
+    """
+    def __init__(self, profiler, model, agent_name):
+        object.__setattr__(self, "_profiler", profiler)
+        object.__setattr__(self, "_model", model)
+        object.__setattr__(self, "_agent_name", agent_name)
+
+    def _record(self, method, *args, **kwargs):
+        with self._profiler.span("llm", getattr(self._model, "model_id", "model"), self._agent_name) as span:
+            span.bytes_in = _size(args[0] if args else kwargs.get("messages"))
+            message = method(*args, **kwargs)
+            span.bytes_out = _size(getattr(message, "content", message)) + _size(getattr(message, "tool_calls", None))
+            span.tokens_in, span.tokens_out, span.cached_tokens = _token_usage(self._model, message)
+            return message
+
+    def __call__(self, *args, **kwargs):
+        return self._record(self._model, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._model, name, value)
+
+class _ProfiledExecutor:
+    """
+    Wraps the Python executor of a CodeAgent so every code action is recorded as an 'executor' span.
+    All other attributes (e.g. static_tools) are forwarded to the wrapped executor.
+    """
+    def __init__(self, profiler, executor, agent_name):
+        object.__setattr__(self, "_profiler", profiler)
+        object.__setattr__(self, "_executor", executor)
+        object.__setattr__(self, "_agent_name", agent_name)
+
+    def __call__(self, code_action, *args, **kwargs):
+        with self._profiler.span("executor", type(self._executor).__name__, self._agent_name) as span:
+            span.bytes_in = _size(code_action)
+            result = self._executor(code_action, *args, **kwargs)
+            span.bytes_out = _size(result)
+            return result
+
+    def __getattr__(self, name):
+        return getattr(self._executor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._executor, name, value)
+
+# ================== PROFILER ==================
+
+class AgentProfiler:
+    """
+    Records where the time of a smolagents run goes: model inference, tool calls (device I/O),
+    the CodeAgent Python executor and managed agents. Works fully offline, no Phoenix endpoint needed.
+
+    Supports the smolagents 1.7 agent loop used in these examples (ManagedAgent, agent.step, model.__call__)
+    and single-threaded runs: spans are recorded on one shared stack.
+
+    Usage:
+        profiler = AgentProfiler()
+        profiler.instrument(manager_agent)
+        manager_agent.run("...")
+        print(profiler.summary())
+        profiler.export_folded("profile.folded")
+    """
+    def __init__(self):
+        self.runs = []
+        self._stack = []
+        self._instrumented = set()
+
+    # ---------- recording ----------
+
+    def span(self, kind:str, name:str, agent:str):
+        """
+        Returns a context manager which records a span as child of the currently open span.
+
+        Args:
+            kind: The category of the span (llm, tool, executor, managed_agent, step, run)
+            name: The name of the span, e.g. the tool name
+            agent: The name of the agent which created the span
+
+        Returns:
+            _SpanContext: Context manager yielding the Span
+        """
+        return _SpanContext(self, Span(kind=kind, name=name, agent=agent))
+
+    def _open(self, span:Span):
+        if self._stack:
+            span.parent = self._stack[-1]
+            span.parent.children.append(span)
+        else:
+            self.runs.append(span)
+        self._stack.append(span)
+
+    def _close(self, span:Span):
+        self._stack.remove(span)
+
+    def reset(self):
+        """
+        Removes all recorded runs.
+        """
+        self.runs = []
+        self._stack = []
+
+    # ---------- instrumentation ----------
+
+    def instrument(self, agent, name:str = None):
+        """
+        Wraps the run, steps, model, tools, Python executor and managed agents of the given agent.
+        Managed agents are instrumented recursively.
+
+        Args:
+            agent: A smolagents CodeAgent or ToolCallingAgent
+            name: The name shown in the reports (default: agent.name or the class name)
+
+        Returns:
+            The same agent (instrumented in place)
+        """
+        if id(agent) in self._instrumented:
+            return agent
+        if hasattr(agent, "_step_stream"):
+            warnings.warn("AgentProfiler supports the smolagents 1.7 agent loop only, "
+                          "steps and streamed model calls of this version are not recorded.")
+        self._instrumented.add(id(agent))
+
+        agent_name = name or getattr(agent, "name", None) or type(agent).__name__
+
+        self._wrap_method(agent, "run", "run", agent_name, agent_name)
+        self._wrap_step(agent, agent_name)
+
+        agent.model = _ProfiledModel(self, agent.model, agent_name)
+
+        if getattr(agent, "python_executor", None) is not None:
+            agent.python_executor = _ProfiledExecutor(self, agent.python_executor, agent_name)
+
+        for tool_name, tool_obj in getattr(agent, "tools", {}).items():
+            self._wrap_method(tool_obj, "forward", "tool", tool_name, agent_name)
+
+        for managed_name, managed in (getattr(agent, "managed_agents", None) or {}).items():
+            # ManagedAgent calls agent.run() of the wrapped agent
+            inner_agent = managed.agent
+            self.instrument(inner_agent, name=managed_name)
+            self._wrap_method(inner_agent, "run", "managed_agent", managed_name, agent_name)
+
+        return agent
+
+    def _wrap_method(self, obj, method_name:str, kind:str, span_name:str, agent_name:str):
+        method = getattr(obj, method_name)
+        profiler = self
+
+        def wrapper(*args, **kwargs):
+            # a managed agent which is run directly (not by its manager) is recorded as a plain run
+            if kind == "managed_agent" and not profiler._stack:
+                return method(*args, **kwargs)
+            with profiler.span(kind, span_name, agent_name) as span:
+                span.bytes_in = _size(args) + _size(kwargs)
+                result = method(*args, **kwargs)
+                if not inspect.isgenerator(result):
+                    span.bytes_out = _size(result)
+                    return result
+            # run(..., stream=True) returns a generator: the steps only run while it is consumed
+            return profiler._profile_generator(result, span)
+
+        setattr(obj, method_name, wrapper)
+
+    def _profile_generator(self, generator, span:Span):
+        """
+        Consumes a streamed run and adds the time of each step to the span which recorded the run() call.
+        The span is only on the stack while the generator runs, so a suspended or abandoned stream
+        does not become the parent of later runs.
+        """
+        try:
+            while True:
+                self._stack.append(span)
+                wall_start = time.perf_counter()
+                cpu_start = time.process_time()
+                try:
+                    item = next(generator)
+                except StopIteration:
+                    return
+                except Exception as exc:
+                    span.error = f"{type(exc).__name__}: {exc}"
+                    raise
+                finally:
+                    span.wall += time.perf_counter() - wall_start
+                    span.cpu += time.process_time() - cpu_start
+                    self._close(span)
+                span.bytes_out += _size(item)
+                yield item
+        finally:
+            generator.close()
+
+    def _wrap_step(self, agent, agent_name:str):
+        step = getattr(agent, "step", None)
+        if step is None:
+            return
+        profiler = self
+
+        def wrapper(memory_step, *args, **kwargs):
+            step_number = getattr(memory_step, "step_number", None) or "?"
+            with profiler.span("step", str(step_number), agent_name):
+                return step(memory_step, *args, **kwargs)
+
+        agent.step = wrapper
+
+    # ---------- reports ----------
+
+    def steps(self) -> list:
+        """
+        Returns one row per agent step with the time split by category.
+
+        Returns:
+            list: List of dicts with wall/CPU time, bytes, tokens and cache hits per step
+        """
+        rows = []
+        for run in self.runs:
+            for span in run.walk():
+                if span.kind != "step":
+                    continue
+                row = {"agent": span.agent, "step": span.name, "wall": span.wall, "cpu": span.cpu,
+                       "bytes_in": 0, "bytes_out": 0, "tokens_in": 0, "tokens_out": 0,
+                       "cached_tokens": 0, "cache_hits": 0, "error": span.error}
+                row.update({kind: 0.0 for kind in ("llm", "tool", "executor", "managed_agent")})
+                for child in span.walk_own():
+                    if child is span:
+                        continue
+                    # a managed agent counts with its whole run, its own steps get separate rows
+                    if child.kind == "managed_agent":
+                        row["managed_agent"] += child.wall
+                    elif child.kind in ("llm", "tool", "executor"):
+                        row[child.kind] += child.self_wall
+                    if child.kind == "llm":
+                        row["tokens_in"] += child.tokens_in
+                        row["tokens_out"] += child.tokens_out
+                        row["cached_tokens"] += child.cached_tokens
+                        row["cache_hits"] += 1 if child.cached_tokens else 0
+                    if child.kind in ("llm", "tool"):
+                        row["bytes_in"] += child.bytes_in
+                        row["bytes_out"] += child.bytes_out
+                rows.append(row)
+        return rows
+
+    def totals(self) -> dict:
+        """
+        Returns the summed self time, calls, bytes and tokens per category over all runs.
+        Managed agents count with their whole run (time, CPU and tokens), their spans are not added to the other categories.
+        'inclusive_wall' also contains the time of nested spans, e.g. the tool calls of an executor step.
+
+        Returns:
+            dict: Mapping kind -> dict of counters
+        """
+        totals = {kind: {"calls": 0, "wall": 0.0, "inclusive_wall": 0.0, "cpu": 0.0, "bytes_in": 0, "bytes_out": 0,
+                         "tokens_in": 0, "tokens_out": 0, "cached_tokens": 0, "cache_hits": 0}
+                  for kind in KINDS}
+        for run in self.runs:
+            for span in run.walk_own():
+                total = totals[span.kind]
+                total["calls"] += 1
+                total["bytes_in"] += span.bytes_in
+                total["bytes_out"] += span.bytes_out
+                if span.kind == "managed_agent":
+                    total["wall"] += span.wall
+                    total["inclusive_wall"] += span.wall
+                    total["cpu"] += span.cpu
+                    llm_spans = [child for child in span.walk() if child.kind == "llm"]
+                else:
+                    total["wall"] += span.self_wall
+                    # spans nested in a span of the same kind are already part of its inclusive time
+                    if not any(name.startswith(span.kind + ":") for name in span.path()[:-1]):
+                        total["inclusive_wall"] += span.wall
+                    total["cpu"] += span.self_cpu
+                    llm_spans = [span]
+                for llm_span in llm_spans:
+                    total["tokens_in"] += llm_span.tokens_in
+                    total["tokens_out"] += llm_span.tokens_out
+                    total["cached_tokens"] += llm_span.cached_tokens
+                    total["cache_hits"] += 1 if llm_span.cached_tokens else 0
+        return totals
+
+    def summary(self) -> str:
+        """
+        Returns a per-step table and a per-category summary of all recorded runs as plain text.
+
+        Returns:
+            str: The summary tables
+        """
+        lines = []
+        header = f"{'agent':<16}{'step':>5}{'wall s':>9}{'cpu s':>8}{'llm s':>8}{'tool s':>8}{'exec s':>8}{'mgd s':>9}{'tok in':>8}{'tok out':>8}{'cached':>8}{'bytes':>10}"
+        lines.append(header)
+        lines.append("-" * len(header))
+        for row in self.steps():
+            lines.append(f"{row['agent'][:15]:<16}{row['step']:>5}{row['wall']:>9.2f}{row['cpu']:>8.2f}"
+                         f"{row['llm']:>8.2f}{row['tool']:>8.2f}{row['executor']:>8.2f}{row['managed_agent']:>9.2f}"
+                         f"{row['tokens_in']:>8}{row['tokens_out']:>8}{row['cached_tokens']:>8}"
+                         f"{row['bytes_in'] + row['bytes_out']:>10}" + (" ERROR" if row["error"] else ""))
+
+        run_wall = sum(run.wall for run in self.runs)
+        lines.append("")
+        header = f"{'category':<16}{'calls':>6}{'time s':>9}{'%':>7}{'incl s':>9}{'cpu s':>8}{'tok in':>8}{'tok out':>8}{'cache hits':>11}{'bytes in':>10}{'bytes out':>10}"
+        lines.append(header)
+        lines.append("-" * len(header))
+        for kind, total in self.totals().items():
+            if not total["calls"]:
+                continue
+            share = 100 * total["wall"] / run_wall if run_wall else 0.0
+            lines.append(f"{kind:<16}{total['calls']:>6}{total['wall']:>9.2f}{share:>7.1f}{total['inclusive_wall']:>9.2f}{total['cpu']:>8.2f}"
+                         f"{total['tokens_in']:>8}{total['tokens_out']:>8}{total['cache_hits']:>11}"
+                         f"{total['bytes_in']:>10}{total['bytes_out']:>10}")
+        lines.append(f"{'total run time':<16}{len(self.runs):>6}{run_wall:>9.2f}")
+        return "\n".join(lines)
+
+    def folded(self) -> str:
+        """
+        Returns the recorded spans in the folded stack format ("a;b;c <microseconds>"),
+        which can be rendered with flamegraph.pl, speedscope or inferno.
+
+        Returns:
+            str: One line per span with its self time in microseconds
+        """
+        stacks = {}
+        for run in self.runs:
+            for span in run.walk():
+                stack = ";".join(name.replace(";", ",").replace(" ", "_") for name in span.path())
+                stacks[stack] = stacks.get(stack, 0) + int(span.self_wall * 1_000_000)
+        return "\n".join(f"{stack} {value}" for stack, value in stacks.items() if value > 0)
+
+    def export_folded(self, filename:str):
+        """
+        Writes the folded stacks to the given file.
+
+        Args:
+            filename: The path of the output file, e.g. 'profile.folded'
+        """
+        with open(filename, "w") as file:
+            file.write(self.folded() + "\n")
+
+    def export_json(self, filename:str):
+        """
+        Writes the per-step rows and category totals to the given JSON file.
+
+        Args:
+            filename: The path of the output file, e.g. 'profile.json'
+        """
+        with open(filename, "w") as file:
+            json.dump({"steps": self.steps(), "totals": self.totals()}, file, indent=4)
+
+class _SpanContext:
+    def __init__(self, profiler:AgentProfiler, span:Span):
+        self.profiler = profiler
+        self.span = span
+
+    def __enter__(self) -> Span:
+        self.profiler._open(self.span)
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.wall = time.perf_counter() - self._wall_start
+        self.span.cpu = time.process_time() - self._cpu_start
+        if exc is not None:
+            self.span.error = f"{exc_type.__name__}: {exc}"
+        self.profiler._close(self.span)
+        return False
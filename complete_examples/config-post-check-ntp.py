@@ -4,6 +4,7 @@
 # ================== IMPORTS ==================
 from smolagents.agents import CodeAgent, ToolCallingAgent, ManagedAgent
 from smolagents import tool, LiteLLMModel, DuckDuckGoSearchTool
+from agent_profiler import AgentProfiler
 
 # ================== TELEMETRY ==================
 from opentelemetry.sdk.trace import TracerProvider
@@ -166,6 +167,11 @@ manager_agent = CodeAgent(
     additional_authorized_imports=['ncclient', 'netmiko','requests','paramiko','io','subprocess'],
 )
 
+# ================== PROFILING ==================
+# records LLM vs. tool vs. executor vs. web agent time per step (works offline, no Phoenix needed)
+profiler = AgentProfiler()
+profiler.instrument(manager_agent, name="manager_agent")
+
 # WORKFLOW
 
 host = "10.10.20.48"
@@ -194,4 +200,8 @@ Follow these rules:
                   
 IP address: {host}
 Changed configuration commands: {configuration_diff}
-""")
\ No newline at end of file
+""")
+
+print(profiler.summary())
+profiler.export_folded("config-post-check-ntp.folded") # flamegraph.pl / speedscope compatible
+profiler.export_json("config-post-check-ntp.profile.json")
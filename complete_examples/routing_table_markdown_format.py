@@ -4,6 +4,7 @@
 # ================== IMPORTS ==================
 from smolagents.agents import CodeAgent, ToolCallingAgent, ManagedAgent
 from smolagents import tool, LiteLLMModel
+from agent_profiler import AgentProfiler
 import json
 
 # ================== TELEMETRY ==================
@@ -70,6 +71,11 @@ device_agent = CodeAgent(tools=[get_username_password_for_device,
 # give the sandboxed Python interpreter access to read/write files outside (use with caution!)
 device_agent.python_executor.static_tools["open"] = open 
 
+# ================== PROFILING ==================
+# records LLM vs. tool vs. executor time per step (works offline, no Phoenix needed)
+profiler = AgentProfiler()
+profiler.instrument(device_agent, name="device_agent")
+
 # ================== TASKS ==================
 # Uncomment to run
 
@@ -78,4 +84,8 @@ device_agent.run("""
                  Summarize the routing table on the Cisco device 10.10.20.48.
                  Save it in the Markdown file 'routing_table_summary.md'.
                  You will at first need the username and password for the device.
-                 """)
\ No newline at end of file
+                 """)
+
+print(profiler.summary())
+profiler.export_folded("routing_table.folded") # flamegraph.pl / speedscope compatible
+profiler.export_json("routing_table.profile.json")